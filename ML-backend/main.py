@@ -1,16 +1,34 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import requests
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, ORJSONResponse
+from anyio import to_thread
+from pydantic import BaseModel, ConfigDict
+import httpx
+import orjson
+import asyncio
 import os
 from dotenv import load_dotenv
 import logging
-from typing import Optional
+from typing import List, Optional
 import random
+import math
+import struct
+import threading
+from collections import OrderedDict
+import numpy as np
+from numba import njit
+import xxhash
 
 load_dotenv()
 
-app = FastAPI(title="Crop Price Prediction ML API", version="1.0.0")
+app = FastAPI(
+    title="Crop Price Prediction ML API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
 
 # CORS
 app.add_middleware(
@@ -21,11 +39,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Logging
-logging.basicConfig(level=logging.INFO)
+# The default handler fails to render errors that echo back rejected NaN/inf
+# inputs (not valid JSON), so those are reported as null
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request, exc: RequestValidationError):
+    detail = jsonable_encoder(
+        exc.errors(),
+        custom_encoder={float: lambda value: value if math.isfinite(value) else None}
+    )
+    return JSONResponse(status_code=422, content={"detail": detail})
+
+# Logging (set LOG_LEVEL=DEBUG to trace Hugging Face calls)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
 class PredictionRequest(BaseModel):
+    # NaN/inf would slip through the compiled kernel as garbage prices, so reject them up front
+    model_config = ConfigDict(extra="forbid", allow_inf_nan=False)
+    
     crop_type: str
     state: str
     city: str
@@ -39,6 +70,8 @@ class PredictionRequest(BaseModel):
     fertilizer_usage: float
 
 class PredictionResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
     predicted_price: float
     current_price: float
     confidence: float
@@ -50,6 +83,95 @@ class PredictionResponse(BaseModel):
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
 HUGGINGFACE_SPACE_URL = "https://rajkhanke007-crop-price-prediction.hf.space"
 
+_HF_HEADERS = {"Content-Type": "application/json"}
+if HUGGINGFACE_API_KEY:
+    _HF_HEADERS["Authorization"] = f"Bearer {HUGGINGFACE_API_KEY}"
+else:
+    logger.debug("No Hugging Face API key found")
+
+# Shared client so Hugging Face calls reuse pooled keep-alive (HTTP/2) connections
+_hf_client = httpx.AsyncClient(
+    timeout=30,
+    limits=httpx.Limits(max_keepalive_connections=20),
+    http2=True
+)
+
+# Candidate Gradio endpoints for Hugging Face Spaces
+HUGGINGFACE_ENDPOINTS = [
+    f"{HUGGINGFACE_SPACE_URL}/run/predict",
+    f"{HUGGINGFACE_SPACE_URL}/api/predict",
+    f"{HUGGINGFACE_SPACE_URL}/predict",
+    f"{HUGGINGFACE_SPACE_URL}/call/predict",
+    f"{HUGGINGFACE_SPACE_URL}/gradio_api/call/predict"
+]
+
+# Endpoint that last answered; requests go straight to it until it fails
+_hf_endpoint: Optional[str] = None
+_hf_discovery: Optional[asyncio.Task] = None
+
+# Sample input used to find a working endpoint at startup
+_HF_PROBE_REQUEST = PredictionRequest(
+    crop_type="Wheat", state="Punjab", city="Ludhiana",
+    year=2024, month=12, season="Rabi",
+    temperature=25.0, rainfall=100.0,
+    supply=1000.0, demand=800.0, fertilizer_usage=50.0
+)
+
+@app.on_event("startup")
+async def warm_up_prediction_kernel():
+    # Compile (or load from cache) the numba kernel before the first request arrives
+    _compute_factors(2000.0, 1, 25.0, 100.0, 1000.0, 1000.0, np.uint64(0))
+
+# Micro-batching: concurrent /predict calls arriving within the wait window
+# are coalesced and evaluated together by the vectorized batch model
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "64"))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "5"))
+
+# Upper bound on the number of requests accepted by one /predict_batch call
+PREDICT_BATCH_MAX_REQUESTS = int(os.getenv("PREDICT_BATCH_MAX_REQUESTS", "1000"))
+
+# Threads available for CPU-bound prediction work (sync endpoints and batches)
+PREDICT_THREADPOOL_SIZE = int(os.getenv("PREDICT_THREADPOOL_SIZE", "64"))
+
+_pending_predictions: Optional[asyncio.Queue] = None
+_prediction_batcher: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def configure_prediction_threadpool():
+    to_thread.current_default_thread_limiter().total_tokens = PREDICT_THREADPOOL_SIZE
+
+@app.on_event("startup")
+async def start_prediction_batcher():
+    global _pending_predictions, _prediction_batcher
+    if PREDICT_BATCH_MAX_SIZE > 1:
+        _pending_predictions = asyncio.Queue()
+        _prediction_batcher = asyncio.create_task(run_prediction_batcher())
+
+@app.on_event("shutdown")
+async def stop_prediction_batcher():
+    global _pending_predictions, _prediction_batcher
+    if _prediction_batcher is not None:
+        _prediction_batcher.cancel()
+        _pending_predictions = _prediction_batcher = None
+
+@app.on_event("startup")
+async def start_huggingface_discovery():
+    global _hf_discovery
+    # Only probe the Space when Hugging Face is actually configured; runs in the
+    # background so an unreachable Space never delays startup
+    if HUGGINGFACE_API_KEY:
+        _hf_discovery = asyncio.create_task(discover_huggingface_endpoint())
+
+@app.on_event("shutdown")
+async def close_huggingface_client():
+    global _hf_discovery
+    if _hf_discovery is not None:
+        # Let the in-flight probes unwind before the client they use is closed
+        _hf_discovery.cancel()
+        await asyncio.gather(_hf_discovery, return_exceptions=True)
+        _hf_discovery = None
+    await _hf_client.aclose()
+
 @app.get("/")
 async def root():
     return {"message": "Crop Price Prediction ML API", "status": "running"}
@@ -59,173 +181,402 @@ async def predict_price(request: PredictionRequest):
     try:
         # Use reliable local deterministic model
         logger.info("Using deterministic local prediction model")
-        return generate_fallback_prediction(request)
+        if _pending_predictions is None:
+            # Batching disabled: still keep the CPU work off the event loop
+            return await run_in_threadpool(generate_fallback_prediction, request)
+        
+        future = asyncio.get_running_loop().create_future()
+        await _pending_predictions.put((request, future))
+        return await future
         
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-async def call_huggingface_api(request: PredictionRequest) -> Optional[PredictionResponse]:
+# Plain def: the work is CPU-only, so FastAPI runs it in the threadpool
+# and the event loop stays free for other requests
+@app.post("/predict_batch", response_model=List[PredictionResponse])
+def predict_price_batch(batch: List[PredictionRequest] = Body(max_length=PREDICT_BATCH_MAX_REQUESTS)):
     try:
-        print(f"DEBUG: Starting Hugging Face API call to {HUGGINGFACE_SPACE_URL}")
-        headers = {"Content-Type": "application/json"}
-        if HUGGINGFACE_API_KEY:
-            headers["Authorization"] = f"Bearer {HUGGINGFACE_API_KEY}"
-            print("DEBUG: API key added to headers")
-        else:
-            print("DEBUG: No API key found")
+        logger.info(f"Using deterministic local prediction model for {len(batch)} requests")
+        return generate_batch_prediction(batch)
         
-        payload = {
-            "crop_type": request.crop_type,
-            "state": request.state,
-            "city": request.city,
-            "year": request.year,
-            "month": request.month,
-            "season": request.season,
-            "temperature": request.temperature,
-            "rainfall": request.rainfall,
-            "supply": request.supply,
-            "demand": request.demand,
-            "fertilizer_usage": request.fertilizer_usage
-        }
-        
-        print(f"DEBUG: Payload: {payload}")
-        
-        # Try Gradio-specific endpoints for Hugging Face Spaces
-        endpoints_to_try = [
-            f"{HUGGINGFACE_SPACE_URL}/run/predict",
-            f"{HUGGINGFACE_SPACE_URL}/api/predict",
-            f"{HUGGINGFACE_SPACE_URL}/predict",
-            f"{HUGGINGFACE_SPACE_URL}/call/predict",
-            f"{HUGGINGFACE_SPACE_URL}/gradio_api/call/predict"
-        ]
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def call_huggingface_api(request: PredictionRequest) -> Optional[PredictionResponse]:
+    global _hf_endpoint
+    try:
+        logger.debug("Starting Hugging Face API call to %s", HUGGINGFACE_SPACE_URL)
+        logger.debug("Payload: %s", request)
         
-        for endpoint in endpoints_to_try:
-            print(f"DEBUG: Trying Gradio endpoint: {endpoint}")
-            try:
-                # Try with Gradio format
-                gradio_payload = {
-                    "data": [
-                        request.crop_type, request.state, request.city,
-                        request.year, request.month, request.season,
-                        request.temperature, request.rainfall,
-                        request.supply, request.demand, request.fertilizer_usage
-                    ],
-                    "fn_index": 0
-                }
-                
-                response = requests.post(
-                    endpoint,
-                    json=gradio_payload,
-                    headers=headers,
-                    timeout=30
-                )
-                
-                print(f"DEBUG: Response status for {endpoint}: {response.status_code}")
-                
-                if response.status_code == 200:
-                    print(f"DEBUG: Success with endpoint: {endpoint}")
-                    data = response.json()
-                    print(f"DEBUG: Response data: {data}")
-                    
-                    # Handle Gradio response format
-                    if "data" in data and len(data["data"]) > 0:
-                        predicted_price = data["data"][0]
-                    else:
-                        predicted_price = data.get("prediction", 0)
-                    
-                    return PredictionResponse(
-                        predicted_price=predicted_price,
-                        current_price=predicted_price * 0.95,
-                        confidence=0.8,
-                        change_percentage=5.0,
-                        unit="quintal",
-                        model="huggingface-gradio"
-                    )
-                else:
-                    print(f"DEBUG: Failed with {endpoint}: {response.status_code}")
-            except Exception as endpoint_error:
-                print(f"DEBUG: Error with {endpoint}: {str(endpoint_error)}")
-                continue
+        # Serialized once and sent as-is to every endpoint tried
+        gradio_payload = orjson.dumps({
+            "data": (
+                request.crop_type, request.state, request.city,
+                request.year, request.month, request.season,
+                request.temperature, request.rainfall,
+                request.supply, request.demand, request.fertilizer_usage
+            ),
+            "fn_index": 0
+        })
         
-        print("DEBUG: All endpoints failed")
-        return None
+        prediction = None
+        endpoint = _hf_endpoint
+        if endpoint is not None:
+            prediction = await _post_gradio_endpoint(endpoint, gradio_payload)
+            if prediction is None and _hf_endpoint == endpoint:
+                # The cached endpoint failed or sent back something unusable:
+                # forget it so concurrent callers stop reusing it
+                _hf_endpoint = None
+        if prediction is None:
+            # No known endpoint, or it stopped answering: rediscover
+            prediction = await _race_gradio_endpoints(gradio_payload)
+        if prediction is None:
+            logger.debug("All Hugging Face endpoints failed")
+        return prediction
     except Exception as e:
-        print(f"DEBUG: Exception in Hugging Face API call: {str(e)}")
         logger.error(f"Hugging Face API error: {e}")
         return None
 
-def generate_fallback_prediction(request: PredictionRequest) -> PredictionResponse:
-    # Create deterministic hash from input parameters for consistent results
-    import hashlib
-    input_string = f"{request.crop_type}-{request.state}-{request.city}-{request.year}-{request.month}-{request.season}-{request.temperature}-{request.rainfall}-{request.supply}-{request.demand}-{request.fertilizer_usage}"
-    hash_value = int(hashlib.md5(input_string.encode()).hexdigest()[:8], 16)
+async def discover_huggingface_endpoint() -> Optional[str]:
+    await call_huggingface_api(_HF_PROBE_REQUEST)
+    if _hf_endpoint is not None:
+        logger.info(f"Using Hugging Face endpoint {_hf_endpoint}")
+    return _hf_endpoint
+
+async def _race_gradio_endpoints(gradio_payload: bytes) -> Optional[PredictionResponse]:
+    global _hf_endpoint
     
-    # Base prices per quintal
-    base_prices = {
-        "Rice": 2000, "Wheat": 1800, "Maize": 1500, "Pulses": 6000,
-        "Soybeans": 3800, "Cotton": 5500, "Sugarcane": 300,
-        "Potato": 1200, "Tomato": 1800, "Onion": 1400
-    }
+    async def attempt(endpoint: str) -> tuple:
+        return endpoint, await _post_gradio_endpoint(endpoint, gradio_payload)
     
-    crop_name = request.crop_type
-    base_price = base_prices.get(crop_name, 2000)
+    # Race all endpoints over the shared connection pool; the first usable
+    # prediction wins and its endpoint is remembered
+    tasks = [asyncio.create_task(attempt(endpoint)) for endpoint in HUGGINGFACE_ENDPOINTS]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            endpoint, prediction = await next_result
+            if prediction is not None:
+                _hf_endpoint = endpoint
+                return prediction
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
     
-    # Seasonal factors
-    seasonal_factors = {
-        1: 1.1, 2: 1.05, 3: 1.0, 4: 0.95, 5: 0.9, 6: 0.85,
-        7: 0.9, 8: 0.95, 9: 1.0, 10: 1.05, 11: 1.1, 12: 1.15
-    }
+    _hf_endpoint = None
+    return None
+
+async def _post_gradio_endpoint(endpoint: str, gradio_payload: bytes) -> Optional[PredictionResponse]:
+    # Returns None unless the endpoint answered with a usable prediction, so an
+    # HTML page or a queued {"event_id": ...} reply never wins the race
+    logger.debug("Trying Gradio endpoint: %s", endpoint)
+    try:
+        response = await _hf_client.post(endpoint, content=gradio_payload, headers=_HF_HEADERS)
+        logger.debug("Response status for %s: %s", endpoint, response.status_code)
+        if response.status_code != 200:
+            return None
+        
+        data = response.json()
+        logger.debug("Response data from %s: %s", endpoint, data)
+        
+        # Handle Gradio response format
+        if isinstance(data.get("data"), list) and len(data["data"]) > 0:
+            predicted_price = data["data"][0]
+        else:
+            predicted_price = data.get("prediction")
+        if isinstance(predicted_price, bool) or not isinstance(predicted_price, (int, float)):
+            logger.debug("No prediction in response from %s", endpoint)
+            return None
+        
+        return PredictionResponse(
+            predicted_price=predicted_price,
+            current_price=predicted_price * 0.95,
+            confidence=0.8,
+            change_percentage=5.0,
+            unit="quintal",
+            model="huggingface-gradio"
+        )
+    except Exception as endpoint_error:
+        logger.debug("Error with %s: %s", endpoint, endpoint_error)
+    return None
+
+# Base prices per quintal
+_BASE_PRICES = {
+    "Rice": 2000, "Wheat": 1800, "Maize": 1500, "Pulses": 6000,
+    "Soybeans": 3800, "Cotton": 5500, "Sugarcane": 300,
+    "Potato": 1200, "Tomato": 1800, "Onion": 1400
+}
+_DEFAULT_BASE_PRICE = 2000
+
+# Crop name -> position in _CROP_PRICES. Unknown crops use index -1,
+# which holds the default price, so lookups never need a branch.
+_CROP_INDEX = {crop: index for index, crop in enumerate(_BASE_PRICES)}
+_CROP_PRICES = np.array([*_BASE_PRICES.values(), _DEFAULT_BASE_PRICE], dtype=np.float64)
+
+# Seasonal factors indexed by month (index 0 is unused)
+_SEASONAL_FACTORS = np.array((
+    1.0,
+    1.1, 1.05, 1.0, 0.95, 0.9, 0.85,
+    0.9, 0.95, 1.0, 1.05, 1.1, 1.15
+))
+
+# Binary layout of the float inputs fed to the prediction hash:
+# temperature, rainfall, supply, demand, fertilizer_usage
+_HASH_NUMERIC_FIELDS = struct.Struct("<5d")
+
+def _season_index(month: int) -> int:
+    # Months outside 1..12 use the neutral factor at index 0; mapping them here
+    # also keeps arbitrarily large ints away from the int64 kernel and arrays
+    return month if 1 <= month <= 12 else 0
+
+def _prediction_hash(
+    crop_type: str, state: str, city: str,
+    year: int, month: int, season: str,
+    temperature: float, rainfall: float,
+    supply: float, demand: float, fertilizer_usage: float
+) -> int:
+    # Create deterministic hash from input parameters for consistent results
+    # (non-cryptographic xxh64 is plenty for seeding and far cheaper than MD5).
+    # Fields are fed as bytes directly, skipping the intermediate f-string.
+    hasher = xxhash.xxh64()
+    # year and month are unbounded ints, so they go in as text rather than fixed-width fields
+    hasher.update(f"{crop_type}\0{state}\0{city}\0{season}\0{year}\0{month}\0".encode())
+    # "+ 0.0" folds -0.0 into 0.0: they compare (and cache) as equal, so they must hash equal too
+    hasher.update(_HASH_NUMERIC_FIELDS.pack(
+        temperature + 0.0, rainfall + 0.0,
+        supply + 0.0, demand + 0.0, fertilizer_usage + 0.0
+    ))
+    return hasher.intdigest()
+
+def generate_fallback_prediction(request: PredictionRequest) -> PredictionResponse:
+    return _prediction_response(_predict_cached(_prediction_key(request)))
+
+def _prediction_key(request: PredictionRequest) -> tuple:
+    # Read the validated fields straight from the instance dict
+    fields = request.__dict__
+    return (
+        fields["crop_type"], fields["state"], fields["city"],
+        fields["year"], fields["month"], fields["season"],
+        fields["temperature"], fields["rainfall"],
+        fields["supply"], fields["demand"], fields["fertilizer_usage"]
+    )
+
+def _prediction_response(values: tuple) -> PredictionResponse:
+    predicted_price, current_price, confidence, change_percentage = values
+    
+    # Values come from our own model, so skip re-validating them
+    return PredictionResponse.model_construct(
+        predicted_price=predicted_price,
+        current_price=current_price,
+        confidence=confidence,
+        change_percentage=change_percentage,
+        unit="quintal",
+        model="deterministic-fallback"
+    )
+
+# The prediction is a pure function of its inputs, so repeated queries for the
+# same crop/location/month are served straight from the cache. It is a plain
+# LRU rather than functools.lru_cache so the batch path can look up hits and
+# store the misses it vectorizes.
+_PREDICTION_CACHE_SIZE = 4096
+_prediction_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_prediction_cache_lock = threading.Lock()
+
+def _cached_prediction(key: tuple) -> Optional[tuple]:
+    with _prediction_cache_lock:
+        values = _prediction_cache.get(key)
+        if values is not None:
+            _prediction_cache.move_to_end(key)
+        return values
+
+def _store_prediction(key: tuple, values: tuple) -> None:
+    with _prediction_cache_lock:
+        _prediction_cache[key] = values
+        _prediction_cache.move_to_end(key)
+        if len(_prediction_cache) > _PREDICTION_CACHE_SIZE:
+            _prediction_cache.popitem(last=False)
+
+def _predict_cached(key: tuple) -> tuple:
+    values = _cached_prediction(key)
+    if values is None:
+        values = _predict(*key)
+        _store_prediction(key, values)
+    return values
+
+def _predict(
+    crop_type: str, state: str, city: str,
+    year: int, month: int, season: str,
+    temperature: float, rainfall: float,
+    supply: float, demand: float, fertilizer_usage: float
+) -> tuple:
+    hash_value = _prediction_hash(
+        crop_type, state, city, year, month, season,
+        temperature, rainfall, supply, demand, fertilizer_usage
+    )
+    base_price = _CROP_PRICES[_CROP_INDEX.get(crop_type, -1)]
+    
+    predicted_price, current_price, confidence, change_percentage = _compute_factors(
+        base_price, _season_index(month), temperature, rainfall, supply, demand, np.uint64(hash_value)
+    )
     
-    seasonal_factor = seasonal_factors.get(request.month, 1.0)
+    return predicted_price, current_price, confidence, change_percentage
+
+# nogil lets threadpool callers run the kernel in parallel. fastmath is left off:
+# reassociating the factor chain could shift results away from the NumPy batch path
+@njit(cache=True, nogil=True)
+def _compute_factors(
+    base_price: float, month_index: int, temperature: float, rainfall: float,
+    supply: float, demand: float, hash_value: int
+) -> tuple:
+    seasonal_factor = _SEASONAL_FACTORS[month_index]
     
     # Supply-demand factor
-    supply_demand_ratio = request.demand / request.supply if request.supply > 0 else 1.0
+    supply_demand_ratio = demand / supply if supply > 0 else 1.0
     supply_demand_factor = min(max(supply_demand_ratio, 0.7), 1.5)
     
-    # Weather factor
-    temp_factor = 1.0
-    if request.temperature > 35:
-        temp_factor = 1.1
-    elif request.temperature < 15:
-        temp_factor = 1.05
-    
-    rainfall_factor = 1.0
-    if request.rainfall < 50:
-        rainfall_factor = 1.15
-    elif request.rainfall > 200:
-        rainfall_factor = 0.95
+    # Weather factor, written branch-free (the bands never overlap):
+    # >35C +10%, <15C +5%; rainfall <50mm +15%, >200mm -5%
+    temp_factor = 1.0 + 0.1 * (temperature > 35) + 0.05 * (temperature < 15)
+    rainfall_factor = 1.0 + 0.15 * (rainfall < 50) - 0.05 * (rainfall > 200)
     
     # Calculate predicted price with deterministic variation
     predicted_price = base_price * seasonal_factor * supply_demand_factor * temp_factor * rainfall_factor
     
-    # Use hash for consistent "randomness" - same input always gives same result
-    variation_factor = 0.95 + (hash_value % 100) / 1000  # 0.95 to 1.049
-    predicted_price = round(predicted_price * variation_factor)
+    # Use hash for consistent "randomness" - same input always gives same result.
+    # hash_value is a uint64, so the constants are too (mixed signedness would promote to float)
+    variation_factor = 0.95 + (hash_value % np.uint64(100)) / 1000  # 0.95 to 1.049
+    # Rounding is half-up via floor(x + 0.5) (prices are always positive, so
+    # int() truncation is enough for them); the batch path mirrors it exactly.
+    # Kept as floats so both paths hand the response model the same types.
+    predicted_price = float(int(predicted_price * variation_factor + 0.5))
     
     # Current price (slightly different but consistent)
-    current_price_variation = 0.95 + ((hash_value >> 8) % 100) / 1000
-    current_price = round(predicted_price * current_price_variation)
+    current_price_variation = 0.95 + ((hash_value >> np.uint64(8)) % np.uint64(100)) / 1000
+    current_price = float(int(predicted_price * current_price_variation + 0.5))
     
-    # Change percentage
-    change_percentage = round(((predicted_price - current_price) / current_price) * 100, 2)
+    # Change percentage (can be negative, hence floor rather than truncation)
+    change_percentage = math.floor(((predicted_price - current_price) / current_price) * 10000 + 0.5) / 100
     
     # Confidence based on input consistency
-    confidence = 0.75 + ((hash_value >> 16) % 200) / 1000  # 0.75 to 0.95
+    confidence = 0.75 + ((hash_value >> np.uint64(16)) % np.uint64(200)) / 1000  # 0.75 to 0.95
+    confidence = math.floor(confidence * 1000 + 0.5) / 1000
     
-    return PredictionResponse(
-        predicted_price=predicted_price,
-        current_price=current_price,
-        confidence=round(confidence, 3),
-        change_percentage=change_percentage,
-        unit="quintal",
-        model="deterministic-fallback"
+    return predicted_price, current_price, confidence, change_percentage
+
+def generate_batch_prediction(batch: List[PredictionRequest]) -> List[PredictionResponse]:
+    return [_prediction_response(values) for values in _predict_batch(batch)]
+
+def _predict_batch(batch: List[PredictionRequest]) -> List[tuple]:
+    # Same model as _predict, evaluated over the whole batch with NumPy
+    count = len(batch)
+    hash_values = np.fromiter(
+        (_prediction_hash(
+            r.crop_type, r.state, r.city, r.year, r.month, r.season,
+            r.temperature, r.rainfall, r.supply, r.demand, r.fertilizer_usage
+        ) for r in batch),
+        dtype=np.uint64, count=count
     )
+    crop_index = np.fromiter((_CROP_INDEX.get(r.crop_type, -1) for r in batch), dtype=np.intp, count=count)
+    base_price = _CROP_PRICES[crop_index]
+    month = np.fromiter((_season_index(r.month) for r in batch), dtype=np.intp, count=count)
+    temperature = np.fromiter((r.temperature for r in batch), dtype=np.float64, count=count)
+    rainfall = np.fromiter((r.rainfall for r in batch), dtype=np.float64, count=count)
+    supply = np.fromiter((r.supply for r in batch), dtype=np.float64, count=count)
+    demand = np.fromiter((r.demand for r in batch), dtype=np.float64, count=count)
+    
+    seasonal_factor = _SEASONAL_FACTORS[month]
+    
+    supply_demand_ratio = np.divide(demand, supply, out=np.ones(count), where=supply > 0)
+    supply_demand_factor = np.clip(supply_demand_ratio, 0.7, 1.5)
+    
+    temp_factor = 1.0 + 0.1 * (temperature > 35) + 0.05 * (temperature < 15)
+    rainfall_factor = 1.0 + 0.15 * (rainfall < 50) - 0.05 * (rainfall > 200)
+    
+    predicted_price = base_price * seasonal_factor * supply_demand_factor * temp_factor * rainfall_factor
+    
+    variation_factor = 0.95 + (hash_values % np.uint64(100)) / 1000
+    predicted_price = np.floor(predicted_price * variation_factor + 0.5)
+    
+    current_price_variation = 0.95 + ((hash_values >> np.uint64(8)) % np.uint64(100)) / 1000
+    current_price = np.floor(predicted_price * current_price_variation + 0.5)
+    
+    change_percentage = np.floor(((predicted_price - current_price) / current_price) * 10000 + 0.5) / 100
+    confidence = 0.75 + ((hash_values >> np.uint64(16)) % np.uint64(200)) / 1000
+    confidence = np.floor(confidence * 1000 + 0.5) / 1000
+    
+    return list(zip(
+        predicted_price.tolist(), current_price.tolist(),
+        confidence.tolist(), change_percentage.tolist()
+    ))
+
+def _evaluate_prediction_batch(batch: List[PredictionRequest]) -> List[PredictionResponse]:
+    # Serve cache hits first and only vectorize the misses
+    keys = [_prediction_key(request) for request in batch]
+    results = [_cached_prediction(key) for key in keys]
+    misses = [i for i, values in enumerate(results) if values is None]
+    
+    # A lone miss is cheaper on the scalar path than through NumPy
+    if len(misses) == 1:
+        results[misses[0]] = _predict_cached(keys[misses[0]])
+    elif misses:
+        for i, values in zip(misses, _predict_batch([batch[i] for i in misses])):
+            results[i] = values
+            _store_prediction(keys[i], values)
+    
+    return [_prediction_response(values) for values in results]
+
+def _evaluate_predictions_individually(batch: List[PredictionRequest]) -> list:
+    # Each entry is either the response or the exception raised for that request
+    results = []
+    for request in batch:
+        try:
+            results.append(generate_fallback_prediction(request))
+        except Exception as e:
+            results.append(e)
+    return results
+
+async def run_prediction_batcher():
+    while True:
+        pending = [await _pending_predictions.get()]
+        await asyncio.sleep(PREDICT_BATCH_MAX_WAIT_MS / 1000)
+        while len(pending) < PREDICT_BATCH_MAX_SIZE and not _pending_predictions.empty():
+            pending.append(_pending_predictions.get_nowait())
+        
+        batch = [request for request, _ in pending]
+        try:
+            # Evaluate off the event loop; new arrivals queue up for the next batch meanwhile
+            results = await run_in_threadpool(_evaluate_prediction_batch, batch)
+        except Exception as e:
+            # One bad request must not fail the rest of the batch, so retry each on its own
+            logger.error(f"Batch prediction error: {e}")
+            results = await run_in_threadpool(_evaluate_predictions_individually, batch)
+        
+        for (_, future), result in zip(pending, results):
+            # The caller may have gone away (client disconnect cancels its await)
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "ML Backend"}
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    # Multiple workers need the app passed as an import string.
+    # uvloop is not available on Windows, where the stdlib loop is used instead.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8001,
+        workers=os.cpu_count(),
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
+    )
\ No newline at end of file
@@ -0,0 +1,90 @@
+import random
+
+import pytest
+from pydantic import ValidationError
+
+from main import (
+    PredictionRequest,
+    _BASE_PRICES,
+    _evaluate_prediction_batch,
+    _prediction_cache,
+    _prediction_key,
+    generate_batch_prediction,
+    generate_fallback_prediction,
+)
+
+
+def _random_requests(count, seed=7):
+    rng = random.Random(seed)
+    crops = list(_BASE_PRICES) + ["Unknown"]
+    return [
+        PredictionRequest(
+            crop_type=rng.choice(crops),
+            state=rng.choice(["Punjab", "Bihar"]),
+            city=rng.choice(["Ludhiana", "Patna", "Gaya"]),
+            year=rng.randint(2000, 2030),
+            month=rng.randint(1, 12),
+            season=rng.choice(["Rabi", "Kharif"]),
+            # Include the exact band edges and signed zero alongside random values
+            temperature=rng.choice([35.0, 15.0, 0.0, -0.0, rng.uniform(-10, 50)]),
+            rainfall=rng.choice([50.0, 200.0, rng.uniform(0, 300)]),
+            supply=rng.choice([0.0, -0.0, rng.uniform(-10, 2000)]),
+            demand=rng.uniform(0, 2000),
+            fertilizer_usage=rng.uniform(0, 100),
+        )
+        for _ in range(count)
+    ]
+
+
+def test_batch_matches_scalar_prediction():
+    requests = _random_requests(2000)
+    _prediction_cache.clear()
+
+    batch = generate_batch_prediction(requests)
+
+    assert len(batch) == len(requests)
+    for request, batch_response in zip(requests, batch):
+        scalar_response = generate_fallback_prediction(request)
+        assert scalar_response.model_dump() == batch_response.model_dump(), request
+        # Responses skip validation, so the field types must already agree
+        assert [type(v) for v in vars(scalar_response).values()] == [type(v) for v in vars(batch_response).values()]
+
+
+def test_prediction_is_deterministic():
+    request = _random_requests(1)[0]
+    first = generate_fallback_prediction(request)
+    _prediction_cache.clear()
+    assert generate_fallback_prediction(request).model_dump() == first.model_dump()
+
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), float("-inf")])
+def test_request_rejects_non_finite_numbers(value):
+    fields = _random_requests(1)[0].model_dump()
+    fields["demand"] = value
+    with pytest.raises(ValidationError):
+        PredictionRequest(**fields)
+
+
+@pytest.mark.parametrize("field, value", [("year", 10**20), ("year", -5), ("month", 0), ("month", 13), ("month", 10**20)])
+def test_out_of_range_dates_still_predict(field, value):
+    fields = _random_requests(1)[0].model_dump()
+    fields[field] = value
+    request = PredictionRequest(**fields)
+
+    scalar_response = generate_fallback_prediction(request)
+    batch_response = generate_batch_prediction([request, request])[0]
+
+    assert scalar_response.model_dump() == batch_response.model_dump()
+
+
+def test_micro_batch_serves_and_fills_the_cache():
+    requests = _random_requests(6, seed=11)
+    _prediction_cache.clear()
+    cached = generate_fallback_prediction(requests[0])
+
+    responses = _evaluate_prediction_batch(requests)
+
+    assert responses[0].model_dump() == cached.model_dump()
+    assert all(_prediction_key(request) in _prediction_cache for request in requests)
+    for request, response in zip(requests, responses):
+        assert generate_fallback_prediction(request).model_dump() == response.model_dump()